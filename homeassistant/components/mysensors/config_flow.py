@@ -1,13 +1,25 @@
 """Config flow for MySensors."""
 from __future__ import annotations
 
+import asyncio
+from functools import lru_cache
 import os
 from typing import Any
+
+from awesomeversion import (
+    AwesomeVersion,
+    AwesomeVersionStrategy,
+    AwesomeVersionStrategyException,
+)
 import voluptuous as vol
-from homeassistant.config_entries import ConfigEntry
+
+from homeassistant.components.mqtt import valid_publish_topic, valid_subscribe_topic
+from homeassistant.config_entries import ConfigEntry, ConfigFlow
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import selector
 from homeassistant.helpers.config_validation import positive_int
+
 from .const import (
     CONF_BAUD_RATE,
     CONF_DEVICE,
@@ -24,12 +36,24 @@ from .const import (
     DOMAIN,
     ConfGatewayType,
 )
-from .gateway import MQTT_COMPONENT, is_serial_port, is_socket_address, try_connect
+from .gateway import (
+    MQTT_COMPONENT,
+    async_is_socket_address,
+    is_serial_port,
+    try_connect,
+)
 
 DEFAULT_BAUD_RATE = 115200
 DEFAULT_TCP_PORT = 5003
 DEFAULT_VERSION = "1.4"
 
+_DEFAULT_DEVICE: dict[ConfGatewayType, str] = {
+    CONF_GATEWAY_TYPE_SERIAL: "/dev/ttyACM0",
+    CONF_GATEWAY_TYPE_TCP: "127.0.0.1",
+}
+_PERSISTENCE_FILE_SUFFIXES = (".json", ".pickle")
+_TCP_PORT_RANGE = range(1, 65536)
+
 _PORT_SELECTOR = vol.All(
     selector.NumberSelector(
         selector.NumberSelectorConfig(
@@ -39,13 +63,94 @@ _PORT_SELECTOR = vol.All(
     vol.Coerce(int),
 )
 
+
+@lru_cache(maxsize=128)
+def _has_persistence_file_suffix(value: str) -> bool:
+    """Return if the persistence file path ends in either .pickle or .json."""
+    return value.endswith(_PERSISTENCE_FILE_SUFFIXES)
+
+
 def validate_persistence_file(value: str) -> str:
     """Validate that persistence file path ends in either .pickle or .json."""
-    if value.endswith((".json", ".pickle")):
+    if _has_persistence_file_suffix(value):
         return value
-    raise vol.Invalid(f"Invalid file format. Please use `.json` or `.pickle`.")
+    raise vol.Invalid("Invalid file format. Please use `.json` or `.pickle`.")
+
+
+# The gateway schemas only carry static defaults, so they are compiled once
+# at import and reused for every form render. Values entered by the user are
+# added as suggested values when the form has to be shown again.
+_COMMON_SCHEMA = {
+    vol.Required(CONF_VERSION, description={"suggested_value": DEFAULT_VERSION}): str,
+    vol.Optional(CONF_PERSISTENCE_FILE): str,
+}
+
+_SERIAL_SCHEMA = vol.Schema(
+    {
+        vol.Required(
+            CONF_DEVICE, default=_DEFAULT_DEVICE[CONF_GATEWAY_TYPE_SERIAL]
+        ): str,
+        vol.Optional(CONF_BAUD_RATE, default=DEFAULT_BAUD_RATE): positive_int,
+        **_COMMON_SCHEMA,
+    }
+)
+
+_TCP_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_DEVICE, default=_DEFAULT_DEVICE[CONF_GATEWAY_TYPE_TCP]): str,
+        vol.Optional(CONF_TCP_PORT, default=DEFAULT_TCP_PORT): _PORT_SELECTOR,
+        **_COMMON_SCHEMA,
+    }
+)
+
+_MQTT_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_TOPIC_IN_PREFIX, default=""): str,
+        vol.Required(CONF_TOPIC_OUT_PREFIX, default=""): str,
+        vol.Required(CONF_RETAIN, default=True): bool,
+        **_COMMON_SCHEMA,
+    }
+)
+
+_SCHEMAS: dict[ConfGatewayType, vol.Schema] = {
+    CONF_GATEWAY_TYPE_SERIAL: _SERIAL_SCHEMA,
+    CONF_GATEWAY_TYPE_TCP: _TCP_SCHEMA,
+    CONF_GATEWAY_TYPE_MQTT: _MQTT_SCHEMA,
+}
+
+
+def _validate_version(version: str) -> dict[str, str]:
+    """Validate a version string from the user."""
+    try:
+        AwesomeVersion(
+            version,
+            ensure_strategy=[
+                AwesomeVersionStrategy.SIMPLEVER,
+                AwesomeVersionStrategy.SEMVER,
+            ],
+        )
+    except AwesomeVersionStrategyException:
+        return {CONF_VERSION: "invalid_version"}
+    return {}
+
+
+def _is_same_device(
+    gw_type: ConfGatewayType, user_input: dict[str, Any], entry: ConfigEntry
+) -> bool:
+    """Check if another ConfigDevice is actually the same as user_input.
+
+    This function only compares addresses and tcp ports, so it is possible to fool it with tricks like port forwarding.
+    """
+    if entry.data[CONF_DEVICE] != user_input[CONF_DEVICE]:
+        return False
+    if gw_type == CONF_GATEWAY_TYPE_TCP:
+        entry_tcp_port: int = entry.data[CONF_TCP_PORT]
+        input_tcp_port: int = user_input[CONF_TCP_PORT]
+        return entry_tcp_port == input_tcp_port
+    return True
+
 
-class MySensorsConfigFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
+class MySensorsConfigFlowHandler(ConfigFlow, domain=DOMAIN):
     """Handle a config flow."""
 
     def __init__(self) -> None:
@@ -81,120 +186,184 @@ class MySensorsConfigFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Create a config entry for a mqtt gateway."""
+        # Naive check that doesn't consider config entry state.
         if MQTT_COMPONENT not in self.hass.config.components:
             return self.async_abort(reason="mqtt_required")
-        
+
         return await self._async_create_gateway_entry(
             user_input, CONF_GATEWAY_TYPE_MQTT, "gw_mqtt"
         )
 
     async def _async_create_gateway_entry(
-        self, user_input: dict[str, Any], gw_type: str, step_id: str
+        self,
+        user_input: dict[str, Any] | None,
+        gw_type: ConfGatewayType,
+        step_id: str,
     ) -> FlowResult:
         """Create a config entry for a gateway."""
+        self._gw_type = gw_type
         errors: dict[str, str] = {}
 
         if user_input is not None:
-            self._validate_topic(user_input, errors, CONF_TOPIC_IN_PREFIX)
-            self._validate_topic(user_input, errors, CONF_TOPIC_OUT_PREFIX)
-            errors.update(await self.validate_common(gw_type, errors, user_input))
+            entries = self._async_current_entries()
+            if gw_type == CONF_GATEWAY_TYPE_MQTT:
+                user_input[CONF_DEVICE] = MQTT_COMPONENT
+                taken_topics = {
+                    topic
+                    for entry in entries
+                    for topic in (
+                        entry.data.get(CONF_TOPIC_IN_PREFIX),
+                        entry.data.get(CONF_TOPIC_OUT_PREFIX),
+                    )
+                    if topic
+                }
+                self._validate_topic(
+                    user_input, errors, CONF_TOPIC_IN_PREFIX, taken_topics
+                )
+                self._validate_topic(
+                    user_input, errors, CONF_TOPIC_OUT_PREFIX, taken_topics
+                )
+            elif gw_type == CONF_GATEWAY_TYPE_TCP and CONF_TCP_PORT in user_input:
+                if user_input[CONF_TCP_PORT] not in _TCP_PORT_RANGE:
+                    errors[CONF_TCP_PORT] = "port_out_of_range"
+            errors.update(
+                await self.validate_common(gw_type, errors, user_input, entries)
+            )
             if not errors:
                 return self._async_create_entry(user_input, gw_type)
 
-        user_input = user_input or {}
         schema = self._get_gateway_schema(user_input, gw_type)
         return self.async_show_form(step_id=step_id, data_schema=schema, errors=errors)
 
-    def _validate_topic(self, user_input, errors, topic_key):
+    def _validate_topic(
+        self,
+        user_input: dict[str, Any],
+        errors: dict[str, str],
+        topic_key: str,
+        taken_topics: set[str],
+    ) -> None:
         """Validate MQTT topic."""
-        try:
-            valid_subscribe_topic(user_input[topic_key])
-        except vol.Invalid:
-            errors[topic_key] = f"invalid_{topic_key}_topic"
+        topic: str = user_input[topic_key]
+        if topic_key == CONF_TOPIC_IN_PREFIX:
+            try:
+                valid_subscribe_topic(topic)
+            except vol.Invalid:
+                errors[topic_key] = "invalid_subscribe_topic"
+                return
         else:
-            if self._check_topic_exists(user_input[topic_key]):
-                errors[topic_key] = f"duplicate_{topic_key}"
-
-    def _get_gateway_schema(self, user_input, gw_type):
-        """Create schema for a specific gateway type."""
-        base_schema = {
-            vol.Required(
-                CONF_DEVICE,
-                default=user_input.get(CONF_DEVICE, self._default_device(gw_type)),
-            ): str,
-            vol.Optional(CONF_BAUD_RATE, default=self._default_baud_rate(gw_type)): positive_int,
-        }
-        return vol.Schema(base_schema, **self._get_common_schema(user_input))
-
-    def _default_device(self, gw_type):
-        """Return default device based on gateway type."""
-        return "/dev/ttyACM0" if gw_type == CONF_GATEWAY_TYPE_SERIAL else "127.0.0.1"
-
-    def _default_baud_rate(self, gw_type):
-        """Return default baud rate based on gateway type."""
-        return DEFAULT_BAUD_RATE if gw_type == CONF_GATEWAY_TYPE_SERIAL else DEFAULT_TCP_PORT
-
-    def _check_topic_exists(self, topic: str) -> bool:
-        for other_config in self._async_current_entries():
-            if topic == other_config.data.get(CONF_TOPIC_IN_PREFIX) or topic == other_config.data.get(CONF_TOPIC_OUT_PREFIX):
-                return True
-        return False
+            try:
+                valid_publish_topic(topic)
+            except vol.Invalid:
+                errors[topic_key] = "invalid_publish_topic"
+                return
+            if errors:
+                return
+            if topic == user_input[CONF_TOPIC_IN_PREFIX]:
+                errors[topic_key] = "same_topic"
+                return
+
+        if topic in taken_topics:
+            errors[topic_key] = "duplicate_topic"
+
+    def _get_gateway_schema(
+        self, user_input: dict[str, Any] | None, gw_type: ConfGatewayType
+    ) -> vol.Schema:
+        """Return the schema for a specific gateway type."""
+        schema = _SCHEMAS[gw_type]
+        if not user_input:
+            return schema
+        return self.add_suggested_values_to_schema(schema, user_input)
 
     @callback
-    def _async_create_entry(self, user_input: dict[str, Any], gw_type: str) -> FlowResult:
+    def _async_create_entry(
+        self, user_input: dict[str, Any], gw_type: ConfGatewayType
+    ) -> FlowResult:
         """Create the config entry."""
         return self.async_create_entry(
             title=f"{user_input[CONF_DEVICE]}",
             data={**user_input, CONF_GATEWAY_TYPE: gw_type},
         )
 
-    def _get_common_schema(self, user_input):
-        """Create a schema with options common to all gateway types."""
-        schema = {
-            vol.Required(
-                CONF_VERSION,
-                description={
-                    "suggested_value": user_input.get(CONF_VERSION, DEFAULT_VERSION)
-                },
-            ): str,
-            vol.Optional(CONF_PERSISTENCE_FILE, default=user_input.get(CONF_PERSISTENCE_FILE, "")): vol.All(str, validate_persistence_file),
-        }
-        return schema
-
-    async def _validate_gateway_address(gw_type, user_input):
-    verification_func = is_socket_address if gw_type == CONF_GATEWAY_TYPE_TCP else is_serial_port
-    try:
-        await asyncio.to_thread(verification_func, user_input[CONF_DEVICE])
-    except vol.Invalid:
-        return "invalid_ip" if gw_type == CONF_GATEWAY_TYPE_TCP else "invalid_serial"
-    return None
-
-async def _validate_connection(hass, gw_type, user_input):
-    if not await try_connect(hass, gw_type, user_input):
-        return "cannot_connect"
-    return None
-
-async def validate_common(self, gw_type, errors, user_input):
-    """Validate parameters common to all gateway types."""
-    errors.update(_validate_version(user_input[CONF_VERSION]))
-
-    if gw_type != CONF_GATEWAY_TYPE_MQTT:
-        address_error = await _validate_gateway_address(gw_type, user_input)
-        if address_error:
-            errors[CONF_DEVICE] = address_error
-
-    persistence_file = user_input.get(CONF_PERSISTENCE_FILE)
-    if persistence_file:
-        self._validate_persistence_file(persistence_file, errors)
-
-    if not errors:
-        for other_entry in self._async_current_entries():
-            if _is_same_device(gw_type, user_input, other_entry):
-                errors["base"] = "already_configured"
-                break
-
-        connection_error = await _validate_connection(self.hass, gw_type, user_input)
-        if connection_error:
-            errors["base"] = connection_error
-
-    return errors
+    def _normalize_persistence_file(self, path: str) -> str:
+        return os.path.realpath(os.path.normcase(self.hass.config.path(path)))
+
+    async def _async_validate_device(
+        self, gw_type: ConfGatewayType, user_input: dict[str, Any]
+    ) -> dict[str, str]:
+        """Validate the device address of a serial or tcp gateway."""
+        if gw_type == CONF_GATEWAY_TYPE_TCP:
+            try:
+                await async_is_socket_address(user_input[CONF_DEVICE])
+            except vol.Invalid:
+                return {CONF_DEVICE: "invalid_ip"}
+        elif gw_type == CONF_GATEWAY_TYPE_SERIAL:
+            try:
+                await self.hass.async_add_executor_job(
+                    is_serial_port, user_input[CONF_DEVICE]
+                )
+            except vol.Invalid:
+                return {CONF_DEVICE: "invalid_serial"}
+        return {}
+
+    def _resolve_persistence_file(
+        self, path: str, entries: list[ConfigEntry]
+    ) -> tuple[dict[str, str], str]:
+        """Return errors and the normalized path of a persistence file."""
+        real_path = self._normalize_persistence_file(path)
+        for other_entry in entries:
+            if CONF_PERSISTENCE_FILE not in other_entry.data:
+                continue
+            if real_path == self._normalize_persistence_file(
+                other_entry.data[CONF_PERSISTENCE_FILE]
+            ):
+                return {CONF_PERSISTENCE_FILE: "duplicate_persistence_file"}, real_path
+        return {}, real_path
+
+    async def validate_common(
+        self,
+        gw_type: ConfGatewayType,
+        errors: dict[str, str],
+        user_input: dict[str, Any],
+        entries: list[ConfigEntry],
+    ) -> dict[str, str]:
+        """Validate parameters common to all gateway types."""
+        errors.update(_validate_version(user_input[CONF_VERSION]))
+
+        persistence_file: str | None = user_input.get(CONF_PERSISTENCE_FILE)
+        if persistence_file is not None:
+            try:
+                validate_persistence_file(persistence_file)
+            except vol.Invalid:
+                errors[CONF_PERSISTENCE_FILE] = "invalid_persistence_file"
+                persistence_file = None
+
+        if persistence_file is None:
+            errors.update(await self._async_validate_device(gw_type, user_input))
+        else:
+            # Resolving the persistence file touches the disk, so do it in the
+            # executor while the device is validated. Connecting to the gateway
+            # has to wait for both, so a duplicate or invalid device is never
+            # opened.
+            device_errors, (persistence_errors, real_path) = await asyncio.gather(
+                self._async_validate_device(gw_type, user_input),
+                self.hass.async_add_executor_job(
+                    self._resolve_persistence_file, persistence_file, entries
+                ),
+            )
+            user_input[CONF_PERSISTENCE_FILE] = real_path
+            errors.update(device_errors)
+            errors.update(persistence_errors)
+
+        # An mqtt gateway is only the same device as another entry if they
+        # share a topic, which the topic checks have already reported.
+        if not errors and gw_type != CONF_GATEWAY_TYPE_MQTT:
+            for other_entry in entries:
+                if _is_same_device(gw_type, user_input, other_entry):
+                    errors["base"] = "already_configured"
+                    break
+
+        # if no errors so far, try to connect
+        if not errors and not await try_connect(self.hass, gw_type, user_input):
+            errors["base"] = "cannot_connect"
+
+        return errors
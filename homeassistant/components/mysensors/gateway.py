@@ -64,13 +64,15 @@ def is_serial_port(value: str) -> str:
     return cv.isdevice(value)
 
 
-def is_socket_address(value: str) -> str:
+async def async_is_socket_address(value: str) -> str:
     """Validate that value is a valid address."""
     try:
-        socket.getaddrinfo(value, None)
-        return value
+        await asyncio.get_running_loop().getaddrinfo(
+            value, None, type=socket.SOCK_STREAM
+        )
     except OSError as err:
         raise vol.Invalid("Device is not a valid domain name or ip address") from err
+    return value
 
 
 async def try_connect(
@@ -9,9 +9,10 @@ from homeassistant.components.switch import SwitchEntity
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-
 from . import ACTUATORS, DOMAIN as COMPONENT_DOMAIN, XS1DeviceEntity
 
+SWITCH_ACTUATOR_TYPES = frozenset({ActuatorType.SWITCH, ActuatorType.DIMMER})
+
 
 def setup_platform(
     hass: HomeAssistant,
@@ -20,28 +21,21 @@ def setup_platform(
     """Set up the XS1 switch platform."""
     actuators = hass.data[COMPONENT_DOMAIN][ACTUATORS]
 
-    switch_entities = []
-    for actuator in actuators:
-        if (actuator.type() == ActuatorType.SWITCH) or (
-            actuator.type() == ActuatorType.DIMMER
-        ):
-            switch_entities.append(XS1SwitchEntity(actuator))
-
-    add_entities(switch_entities)
+    add_entities(
+        XS1SwitchEntity(actuator)
+        for actuator in actuators
+        if actuator.type() in SWITCH_ACTUATOR_TYPES
+    )
 
 
 class XS1SwitchEntity(XS1DeviceEntity, SwitchEntity):
     """Representation of a XS1 switch actuator."""
 
-    @property
-    def name(self):
-        """Return the name of the device if any."""
-        return self.device.name()
-
-    @property
-    def is_on(self):
-        """Return true if switch is on."""
-        return self.device.value() == 100
+    def __init__(self, device) -> None:
+        """Initialize the switch actuator."""
+        super().__init__(device)
+        self._attr_name = device.name()
+        self._attr_is_on = device.value() == 100
 
     def turn_on(self, **kwargs: Any) -> None:
         """Turn the device on."""
@@ -50,3 +44,8 @@ class XS1SwitchEntity(XS1DeviceEntity, SwitchEntity):
     def turn_off(self, **kwargs: Any) -> None:
         """Turn the device off."""
         self.device.turn_off()
+
+    async def async_update(self) -> None:
+        """Retrieve latest switch state."""
+        await super().async_update()
+        self._attr_is_on = self.device.value() == 100
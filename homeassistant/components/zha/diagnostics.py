@@ -2,13 +2,13 @@
 from __future__ import annotations
 
 import dataclasses
+from functools import cache, lru_cache
 from importlib.metadata import version
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from zigpy.config import CONF_NWK_EXTENDED_PAN_ID
 from zigpy.profiles import PROFILES
 from zigpy.types import Channels
-from zigpy.zcl import Cluster
 
 from homeassistant.components.diagnostics.util import async_redact_data
 from homeassistant.config_entries import ConfigEntry
@@ -30,29 +30,55 @@ from .core.const import (
 from .core.device import ZHADevice
 from .core.helpers import async_get_zha_device, get_zha_data, get_zha_gateway
 
-KEYS_TO_REDACT = {
-    ATTR_IEEE,
-    CONF_UNIQUE_ID,
-    CONF_ALARM_MASTER_CODE,
-    "network_key",
-    CONF_NWK_EXTENDED_PAN_ID,
-    "partner_ieee",
-}
+if TYPE_CHECKING:
+    from zigpy.zcl import Cluster
+
+KEYS_TO_REDACT = frozenset(
+    {
+        ATTR_IEEE,
+        CONF_UNIQUE_ID,
+        CONF_ALARM_MASTER_CODE,
+        "network_key",
+        CONF_NWK_EXTENDED_PAN_ID,
+        "partner_ieee",
+    }
+)
 
 ATTRIBUTES = "attributes"
 CLUSTER_DETAILS = "cluster_details"
 UNSUPPORTED_ATTRIBUTES = "unsupported_attributes"
 
+# Diagnostics key and distribution name of the packages to report versions for
+VERSIONED_PACKAGES = (
+    ("bellows", "bellows"),
+    ("zigpy", "zigpy"),
+    ("zigpy_deconz", "zigpy-deconz"),
+    ("zigpy_xbee", "zigpy-xbee"),
+    ("zigpy_znp", "zigpy_znp"),
+    ("zigpy_zigate", "zigpy-zigate"),
+    ("zhaquirks", "zha-quirks"),
+)
+
+
+@cache
+def _package_version(package: str) -> str:
+    """Return the installed version of a package."""
+    return version(package)
+
+
+@cache
+def _dataclass_field_names(cls: type) -> tuple[str, ...]:
+    """Return the field names of a dataclass type."""
+    return tuple(field.name for field in dataclasses.fields(cls))
+
 
 def shallow_asdict(obj: Any) -> dict:
     """Return a shallow copy of a dataclass as a dict."""
     if hasattr(obj, "__dataclass_fields__"):
-        result = {}
-
-        for field in dataclasses.fields(obj):
-            result[field.name] = shallow_asdict(getattr(obj, field.name))
-
-        return result
+        return {
+            name: shallow_asdict(getattr(obj, name))
+            for name in _dataclass_field_names(obj.__class__)
+        }
     if hasattr(obj, "as_dict"):
         return obj.as_dict()
     return obj
@@ -69,26 +95,23 @@ async def async_get_config_entry_diagnostics(
         channels=Channels.ALL_CHANNELS, duration_exp=4, count=1
     )
 
-    return async_redact_data(
+    diagnostics: dict[str, Any] = async_redact_data(
         {
             "config": zha_data.yaml_config,
             "config_entry": config_entry.as_dict(),
             "application_state": shallow_asdict(app.state),
-            "energy_scan": {
-                channel: 100 * energy / 255 for channel, energy in energy_scan.items()
-            },
-            "versions": {
-                "bellows": version("bellows"),
-                "zigpy": version("zigpy"),
-                "zigpy_deconz": version("zigpy-deconz"),
-                "zigpy_xbee": version("zigpy-xbee"),
-                "zigpy_znp": version("zigpy_znp"),
-                "zigpy_zigate": version("zigpy-zigate"),
-                "zhaquirks": version("zha-quirks"),
-            },
         },
         KEYS_TO_REDACT,
     )
+    # The energy scan and versions never contain keys that need to be redacted,
+    # so they are added after redacting instead of being copied by it
+    diagnostics["energy_scan"] = {
+        channel: 100 * energy / 255 for channel, energy in energy_scan.items()
+    }
+    diagnostics["versions"] = {
+        key: _package_version(package) for key, package in VERSIONED_PACKAGES
+    }
+    return diagnostics
 
 
 async def async_get_device_diagnostics(
@@ -96,9 +119,21 @@ async def async_get_device_diagnostics(
 ) -> dict[str, Any]:
     """Return diagnostics for a device."""
     zha_device: ZHADevice = async_get_zha_device(hass, device.id)
-    device_info: dict[str, Any] = zha_device.zha_device_info
+    device_info: dict[str, Any] = async_redact_data(
+        zha_device.zha_device_info, KEYS_TO_REDACT
+    )
+    # The cluster details are keyed by endpoint, cluster and attribute ids and
+    # never contain keys that need to be redacted, so they are not copied again
     device_info[CLUSTER_DETAILS] = get_endpoint_cluster_attr_data(zha_device)
-    return async_redact_data(device_info, KEYS_TO_REDACT)
+    return device_info
+
+
+@lru_cache(maxsize=256)
+def _device_type_name(profile_id: int | None, device_type: int | None) -> str:
+    """Return the name of the device type of an endpoint."""
+    if (profile := PROFILES.get(profile_id)) is None or device_type is None:
+        return UNKNOWN
+    return profile.DeviceType(device_type).name
 
 
 def get_endpoint_cluster_attr_data(zha_device: ZHADevice) -> dict:
@@ -107,30 +142,18 @@ def get_endpoint_cluster_attr_data(zha_device: ZHADevice) -> dict:
     for ep_id, endpoint in zha_device.device.endpoints.items():
         if ep_id == 0:
             continue
-        endpoint_key = (
-            f"{PROFILES.get(endpoint.profile_id).DeviceType(endpoint.device_type).name}"
-            if PROFILES.get(endpoint.profile_id) is not None
-            and endpoint.device_type is not None
-            else UNKNOWN
-        )
         cluster_details[ep_id] = {
             ATTR_DEVICE_TYPE: {
-                CONF_NAME: endpoint_key,
+                CONF_NAME: _device_type_name(endpoint.profile_id, endpoint.device_type),
                 CONF_ID: endpoint.device_type,
             },
             ATTR_PROFILE_ID: endpoint.profile_id,
             ATTR_IN_CLUSTERS: {
-                f"0x{cluster_id:04x}": {
-                    "endpoint_attribute": cluster.ep_attribute,
-                    **get_cluster_attr_data(cluster),
-                }
+                f"0x{cluster_id:04x}": get_cluster_attr_data(cluster)
                 for cluster_id, cluster in endpoint.in_clusters.items()
             },
             ATTR_OUT_CLUSTERS: {
-                f"0x{cluster_id:04x}": {
-                    "endpoint_attribute": cluster.ep_attribute,
-                    **get_cluster_attr_data(cluster),
-                }
+                f"0x{cluster_id:04x}": get_cluster_attr_data(cluster)
                 for cluster_id, cluster in endpoint.out_clusters.items()
             },
         }
@@ -139,19 +162,22 @@ def get_endpoint_cluster_attr_data(zha_device: ZHADevice) -> dict:
 
 def get_cluster_attr_data(cluster: Cluster) -> dict:
     """Return cluster attribute data."""
+    cluster_get = cluster.get
     return {
+        "endpoint_attribute": cluster.ep_attribute,
         ATTRIBUTES: {
             f"0x{attr_id:04x}": {
-                ATTR_ATTRIBUTE_NAME: attr_def.name,
+                ATTR_ATTRIBUTE_NAME: attr_name,
                 ATTR_VALUE: attr_value,
             }
             for attr_id, attr_def in cluster.attributes.items()
-            if (attr_value := cluster.get(attr_def.name)) is not None
+            if (attr_value := cluster_get(attr_name := attr_def.name)) is not None
         },
         UNSUPPORTED_ATTRIBUTES: {
-            f"0x{cluster.find_attribute(u_attr).id:04x}": {
-                ATTR_ATTRIBUTE_NAME: cluster.find_attribute(u_attr).name
-            }
-            for u_attr in cluster.unsupported_attributes
+            f"0x{attr_def.id:04x}": {ATTR_ATTRIBUTE_NAME: attr_def.name}
+            for attr_def in (
+                cluster.find_attribute(u_attr)
+                for u_attr in cluster.unsupported_attributes
+            )
         },
     }
@@ -1,6 +1,7 @@
 """Test the MySensors config flow."""
 from __future__ import annotations
 
+import os
 from typing import Any
 from unittest.mock import patch
 
@@ -35,6 +36,15 @@ GATEWAY_TYPE_TO_STEP = {
 }
 
 
+def get_suggested(schema, key):
+    """Get suggested value for key in voluptuous schema."""
+    for k in schema:
+        if k == key:
+            if k.description is None or "suggested_value" not in k.description:
+                return None
+            return k.description["suggested_value"]
+
+
 async def get_form(
     hass: HomeAssistant, gateway_type: ConfGatewayType, expected_step_id: str
 ) -> FlowResult:
@@ -672,3 +682,53 @@ async def test_duplicate(
 
         for key, val in expected_result.items():
             assert result[key] == val  # type: ignore[literal-required]
+
+
+async def test_form_suggested_values(hass: HomeAssistant) -> None:
+    """Test that entered values are suggested when the form is shown again."""
+    MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_GATEWAY_TYPE: CONF_GATEWAY_TYPE_TCP,
+            CONF_DEVICE: "127.0.0.1",
+            CONF_PERSISTENCE_FILE: "same.json",
+            CONF_TCP_PORT: 343,
+            CONF_VERSION: "2.3",
+        },
+    ).add_to_hass(hass)
+
+    step = await get_form(hass, CONF_GATEWAY_TYPE_TCP, "gw_tcp")
+    schema = step["data_schema"].schema
+    assert get_suggested(schema, CONF_DEVICE) is None
+    assert get_suggested(schema, CONF_VERSION) == "1.4"
+    assert get_suggested(schema, CONF_PERSISTENCE_FILE) is None
+
+    with patch(
+        "homeassistant.components.mysensors.config_flow.try_connect", return_value=True
+    ), patch(
+        "homeassistant.components.mysensors.async_setup_entry",
+        return_value=True,
+    ) as mock_setup_entry:
+        result = await hass.config_entries.flow.async_configure(
+            step["flow_id"],
+            {
+                CONF_DEVICE: "192.168.1.2",
+                CONF_PERSISTENCE_FILE: "same.json",
+                CONF_TCP_PORT: 5003,
+                CONF_VERSION: "2.4",
+            },
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {CONF_PERSISTENCE_FILE: "duplicate_persistence_file"}
+    assert len(mock_setup_entry.mock_calls) == 0
+
+    # The persistence file is suggested with the path it was resolved to
+    schema = result["data_schema"].schema
+    assert get_suggested(schema, CONF_DEVICE) == "192.168.1.2"
+    assert get_suggested(schema, CONF_TCP_PORT) == 5003
+    assert get_suggested(schema, CONF_VERSION) == "2.4"
+    assert get_suggested(schema, CONF_PERSISTENCE_FILE) == os.path.realpath(
+        os.path.normcase(hass.config.path("same.json"))
+    )
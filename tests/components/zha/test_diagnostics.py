@@ -1,14 +1,18 @@
 """Tests for the diagnostics data provided by the ESPHome integration."""
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 import zigpy.profiles.zha as zha
 import zigpy.zcl.clusters.security as security
 
 from homeassistant.components.diagnostics import REDACTED
+from homeassistant.components.zha.core.const import UNKNOWN
 from homeassistant.components.zha.core.device import ZHADevice
 from homeassistant.components.zha.core.helpers import get_zha_gateway
-from homeassistant.components.zha.diagnostics import KEYS_TO_REDACT
+from homeassistant.components.zha.diagnostics import (
+    KEYS_TO_REDACT,
+    get_endpoint_cluster_attr_data,
+)
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import async_get
@@ -107,3 +111,29 @@ async def test_diagnostics_for_device(
             assert key in diagnostics_data
         else:
             assert diagnostics_data[key] == REDACTED
+
+
+@pytest.mark.parametrize(
+    ("profile_id", "device_type"),
+    [
+        (None, None),
+        (None, zha.DeviceType.IAS_ANCILLARY_CONTROL),
+        (zha.PROFILE_ID, None),
+    ],
+)
+def test_endpoint_unknown_device_type(profile_id, device_type) -> None:
+    """Test endpoints without a known profile or device type."""
+    endpoint = MagicMock(
+        profile_id=profile_id, device_type=device_type, in_clusters={}, out_clusters={}
+    )
+    zha_device = MagicMock()
+    zha_device.device.endpoints = {0: MagicMock(), 1: endpoint}
+
+    assert get_endpoint_cluster_attr_data(zha_device) == {
+        1: {
+            "device_type": {"name": UNKNOWN, "id": device_type},
+            "profile_id": profile_id,
+            "in_clusters": {},
+            "out_clusters": {},
+        }
+    }